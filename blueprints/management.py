@@ -2,6 +2,8 @@ from flask import Blueprint, render_template, session, request, jsonify, flash,
 from database.auth_db import get_auth_token
 from services.positionbook_service import get_positionbook_with_auth
 from database.management_db import get_rules_for_user, add_rule, delete_rule
+from utils.constants import NET_QTY_KEYS
+import pandas as pd
 import json
 from utils.logging import get_logger
 
@@ -24,24 +26,7 @@ def index():
         if auth_token:
             success, response, _ = get_positionbook_with_auth(auth_token, broker)
             if success:
-                # Filter for open positions (netqty != 0)
-                # Normalize netqty to ensure it exists for template
-                def get_net_qty(p):
-                    for key in ['quantity', 'netqty', 'net_qty', 'qty']:
-                        if key in p:
-                            try:
-                                return float(p[key])
-                            except (ValueError, TypeError):
-                                continue
-                    return 0
-
-                filtered_positions = []
-                for p in response.get('data', []):
-                    qty = get_net_qty(p)
-                    if qty != 0:
-                        p['netqty'] = qty  # Ensure template has access to netqty
-                        filtered_positions.append(p)
-                positions = filtered_positions
+                positions = response.get('data', [])
             else:
                 logger.error(f"Failed to fetch positions for {username}: {response}")
         else:
@@ -52,35 +37,52 @@ def index():
     # Fetch Rules
     rules = get_rules_for_user(username)
 
-    # Separate exact rules and group rules for smarter matching
-    exact_rules = {}
-    group_rules = []
-
-    for r in rules:
-        if r.is_group_rule:
-            group_rules.append(r)
-        # We also store group rules in exact_rules for direct lookup if symbols match exactly
-        exact_rules[(r.symbol, r.product)] = r
-
-    # Merge rules with positions
+    # The frame only computes netqty and the matching rule per position; the
+    # broker's dicts are passed to the template untouched otherwise, so fields
+    # missing on some rows stay missing instead of becoming NaN
     merged_positions = []
-    for p in positions:
-        # 1. Try exact match first
-        rule = exact_rules.get((p['symbol'], p['product']))
+    if positions:
+        positions_df = pd.DataFrame(positions)
+
+        # Normalize netqty: first numeric value among the broker-specific quantity fields
+        qty_cols = [c for c in NET_QTY_KEYS if c in positions_df.columns]
+        if qty_cols:
+            netqty = (positions_df[qty_cols]
+                      .apply(pd.to_numeric, errors='coerce')
+                      .bfill(axis=1)
+                      .iloc[:, 0]
+                      .fillna(0.0))
+        else:
+            netqty = pd.Series(0.0, index=positions_df.index)
+
+        # 1. Exact match on (symbol, product); group rules are included for direct lookup too.
+        # Later rules win on duplicate keys, so the left join keeps one row per position.
+        rules_df = pd.DataFrame(
+            [(r.symbol, r.product, r) for r in rules],
+            columns=['symbol', 'product', 'rule']
+        ).drop_duplicates(subset=['symbol', 'product'], keep='last')
+        keys_df = positions_df.reindex(columns=['symbol', 'product']).astype(object)
+        matched = keys_df.merge(rules_df, on=['symbol', 'product'], how='left')['rule']
+        matched = matched.astype(object).where(matched.notna(), None)
 
         # 2. If no exact match, look for applicable group rule
-        if not rule:
-            for gr in group_rules:
-                # Check if position starts with rule symbol (Prefix Match) AND Product matches
-                if p['symbol'].startswith(gr.symbol) and p['product'] == gr.product:
-                    rule = gr
-                    # If we find a match, use it.
-                    # Note: If multiple group rules match, this picks the first one.
-                    # Ideally, specific rules should take precedence, which exact_rules handles.
-                    break
-
-        p['rule'] = rule
-        merged_positions.append(p)
+        # Check if position starts with rule symbol (Prefix Match) AND Product matches
+        # Note: If multiple group rules match, this picks the first one.
+        for gr in (r for r in rules if r.is_group_rule):
+            unmatched = matched.isna()
+            if not unmatched.any():
+                break
+            mask = (unmatched
+                    & (keys_df['product'] == gr.product)
+                    & keys_df['symbol'].str.startswith(gr.symbol, na=False))
+            matched[mask] = gr
+
+        # Filter for open positions (netqty != 0)
+        for p, qty, rule in zip(positions, netqty.tolist(), matched.tolist()):
+            if qty != 0:
+                p['netqty'] = qty  # Ensure template has access to netqty
+                p['rule'] = rule
+                merged_positions.append(p)
 
     return render_template('management/index.html', positions=merged_positions)
 
@@ -2,7 +2,7 @@ from flask import Blueprint, render_template, session, request, jsonify
 from services.history_service import get_history
 from database.auth_db import get_auth_token, get_feed_token
 from database.symbol import enhanced_search_symbols
-import pandas as pd
+import numpy as np
 import datetime
 from utils.logging import get_logger
 
@@ -10,6 +10,17 @@ logger = get_logger(__name__)
 
 screener_bp = Blueprint('screener_bp', __name__, url_prefix='/screener')
 
+def calculate_ema(values, span):
+    """
+    Exponential moving average of the last value in `values`.
+    Equivalent to pandas ewm(span=span, adjust=False).mean().iloc[-1].
+    """
+    alpha = 2.0 / (span + 1)
+    ema = values[0]
+    for x in values[1:]:
+        ema = alpha * x + (1 - alpha) * ema
+    return ema
+
 @screener_bp.route('/')
 def index():
     return render_template('screener.html')
@@ -82,23 +93,19 @@ def scan_vbl():
         if not data:
             return jsonify({'status': 'error', 'message': 'No data returned'}), 404
 
-        # Create DataFrame
-        df = pd.DataFrame(data)
-
-        # Check if 'close' column exists
-        if 'close' not in df.columns:
-             logger.error(f"Missing 'close' column in response data. Columns: {df.columns}")
+        # Check if 'close' field exists
+        if not all('close' in row for row in data):
+             logger.error(f"Missing 'close' field in response data. Fields: {list(data[0].keys())}")
              return jsonify({'status': 'error', 'message': 'Invalid data format received from broker'}), 500
 
         # Ensure numeric
-        df['close'] = pd.to_numeric(df['close'])
+        closes = np.asarray([float(row['close']) for row in data], dtype=np.float64)
 
         # Calculate 20 EMA
-        df['ema_20'] = df['close'].ewm(span=20, adjust=False).mean()
+        ema_20 = calculate_ema(closes, 20)
 
-        last_row = df.iloc[-1]
-        current_price = last_row['close']
-        ema_20 = last_row['ema_20']
+        last_row = data[-1]
+        current_price = closes[-1]
 
         # Determine signal
         signal = "NEUTRAL"
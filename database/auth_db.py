@@ -104,6 +104,9 @@ broker_cache = TTLCache(maxsize=1024, ttl=3000)
 verified_api_key_cache = TTLCache(maxsize=1024, ttl=36000)  # 10 hours
 # Define a cache for invalid API keys with shorter 5-minute TTL (prevent cache poisoning)
 invalid_api_key_cache = TTLCache(maxsize=512, ttl=300)  # 5 minutes
+# Define a cache for encrypted API keys by user_id (polled every pass by the management service)
+# Security: Stores the encrypted value only, invalidated on key regeneration
+encrypted_api_key_cache = TTLCache(maxsize=1024, ttl=3000)
 
 # Conditionally create engine based on DB type
 if DATABASE_URL and 'sqlite' in DATABASE_URL:
@@ -327,6 +330,7 @@ def invalidate_user_cache(user_id):
     feed_token_cache.clear()
     verified_api_key_cache.clear()
     invalid_api_key_cache.clear()
+    encrypted_api_key_cache.clear()
     logger.info(f"Cleared all caches for user_id: {user_id}")
 
 def upsert_api_key(user_id, api_key):
@@ -368,10 +372,15 @@ def get_api_key(user_id):
 def get_api_key_for_tradingview(user_id):
     """Get decrypted API key for TradingView configuration"""
     try:
-        api_key_obj = ApiKeys.query.filter_by(user_id=user_id).first()
-        if api_key_obj and api_key_obj.api_key_encrypted:
-            return decrypt_token(api_key_obj.api_key_encrypted)
-        return None
+        # Check cache first; only the encrypted value is cached
+        encrypted_key = encrypted_api_key_cache.get(user_id)
+        if encrypted_key is None:
+            api_key_obj = ApiKeys.query.filter_by(user_id=user_id).first()
+            if not api_key_obj or not api_key_obj.api_key_encrypted:
+                return None
+            encrypted_key = api_key_obj.api_key_encrypted
+            encrypted_api_key_cache[user_id] = encrypted_key
+        return decrypt_token(encrypted_key)
     except Exception as e:
         logger.error(f"Error while querying the database for API key: {e}")
         return None
@@ -0,0 +1,86 @@
+"""
+Closed OHLC candles for the management service, persisted in DuckDB.
+Candles are keyed by (symbol, ts) where ts is the bar end in epoch milliseconds
+(right-labelled, as built by TickStore.last_closed_bar); higher timeframes are
+aggregated in SQL rather than kept in memory.
+"""
+
+import os
+import threading
+import duckdb
+from utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+CANDLE_DB_PATH = os.getenv('CANDLE_DB_PATH', 'db/candles.duckdb')
+
+# One connection per process; DuckDB connections are not safe to share across
+# threads without serializing access
+_conn = None
+_lock = threading.Lock()
+
+_CREATE_CANDLES = """
+    CREATE TABLE IF NOT EXISTS candles (
+        symbol VARCHAR NOT NULL,
+        ts BIGINT NOT NULL,
+        open DOUBLE,
+        high DOUBLE,
+        low DOUBLE,
+        close DOUBLE,
+        PRIMARY KEY (symbol, ts)
+    )
+"""
+
+def get_connection():
+    """Open the candle database on first use and make sure the table exists"""
+    global _conn
+    if _conn is None:
+        if CANDLE_DB_PATH != ':memory:':
+            os.makedirs(os.path.dirname(CANDLE_DB_PATH) or '.', exist_ok=True)
+        conn = duckdb.connect(CANDLE_DB_PATH)
+        conn.execute(_CREATE_CANDLES)
+        _conn = conn
+    return _conn
+
+def save_candles(candles):
+    """
+    Upsert closed candles in one batch. `candles` is an iterable of
+    (symbol, bar) where bar has 'ts', 'open', 'high', 'low', 'close'.
+    """
+    rows = [(symbol, bar['ts'], bar['open'], bar['high'], bar['low'], bar['close'])
+            for symbol, bar in candles]
+    if not rows:
+        return 0
+    with _lock:
+        get_connection().executemany(
+            "INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?)", rows
+        )
+    return len(rows)
+
+def get_candles(symbol, start_ts, end_ts, interval_minutes=1):
+    """
+    Candles for `symbol` with bar end in [start_ts, end_ts] (epoch ms), oldest first,
+    as (ts, open, high, low, close) tuples. interval_minutes > 1 aggregates the
+    stored 1-minute bars into right-labelled buckets of that size.
+    """
+    with _lock:
+        conn = get_connection()
+        if interval_minutes == 1:
+            return conn.execute(
+                "SELECT ts, open, high, low, close FROM candles "
+                "WHERE symbol = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+                [symbol, start_ts, end_ts]
+            ).fetchall()
+
+        bucket_ms = int(interval_minutes) * 60_000
+        return conn.execute(
+            """
+            SELECT ((ts + ? - 1) // ?) * ? AS bucket,
+                   arg_min(open, ts), max(high), min(low), arg_max(close, ts)
+            FROM candles
+            WHERE symbol = ? AND ts BETWEEN ? AND ?
+            GROUP BY bucket
+            ORDER BY bucket
+            """,
+            [bucket_ms, bucket_ms, bucket_ms, symbol, start_ts, end_ts]
+        ).fetchall()
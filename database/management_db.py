@@ -1,5 +1,5 @@
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Float, Boolean, DateTime, Text
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, Boolean, DateTime, Text, Index, select, update, bindparam
 from sqlalchemy.orm import scoped_session, sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.pool import NullPool
@@ -13,6 +13,14 @@ DATABASE_URL = os.getenv('DATABASE_URL', 'sqlite:///database.db')
 
 if 'sqlite' in DATABASE_URL:
     engine = create_engine(DATABASE_URL, poolclass=NullPool, connect_args={'check_same_thread': False})
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """Wait for the lock instead of failing while the rule checker writes"""
+        # Per-connection only: journal_mode is left alone since the file is shared with other DBs
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA busy_timeout=5000')
+        cursor.close()
 else:
     engine = create_engine(DATABASE_URL, pool_size=50, max_overflow=100, pool_timeout=10)
 
@@ -53,6 +61,11 @@ class ManagementRule(Base):
     created_at = Column(DateTime, default=datetime.now)
     last_triggered = Column(DateTime, nullable=True)
 
+    __table_args__ = (
+        Index('idx_mgmt_active_user', 'is_active', 'user_id'),      # Speeds up active-rule scan ordered by user
+        Index('idx_mgmt_symbol_product', 'symbol', 'product'),      # Speeds up symbol/product rule lookups
+    )
+
 def init_db():
     from database.db_init_helper import init_db_with_logging
     init_db_with_logging(Base, engine, "Management DB", logger)
@@ -93,11 +106,57 @@ def init_db():
                     except Exception as e:
                         logger.warning(f"Failed to add included_positions column: {e}")
 
+                # Add composite indexes missing from tables created before they were declared
+                try:
+                    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_mgmt_active_user ON management_rules(is_active, user_id)"))
+                    conn.execute(text("CREATE INDEX IF NOT EXISTS idx_mgmt_symbol_product ON management_rules(symbol, product)"))
+                    conn.commit()
+                except Exception as e:
+                    logger.warning(f"Failed to create management_rules indexes: {e}")
+
         except Exception as e:
             logger.error(f"Error during Management DB schema verification: {e}")
 
+# Statements built once at import; SQLAlchemy reuses their compiled form from the
+# statement cache instead of rebuilding the query through the ORM on every call.
+# Active rules are read as plain rows with only the columns the rule checker uses,
+# skipping the candle_condition TEXT, audit timestamps and ORM identity-map bookkeeping.
+_ACTIVE_RULES_STMT = (
+    select(
+        ManagementRule.id,
+        ManagementRule.user_id,
+        ManagementRule.symbol,
+        ManagementRule.exchange,
+        ManagementRule.product,
+        ManagementRule.exit_type,
+        ManagementRule.max_loss,
+        ManagementRule.target_profit,
+        ManagementRule.is_group_rule,
+        ManagementRule.included_positions,
+    )
+    .where(ManagementRule.is_active == True)
+    .order_by(ManagementRule.user_id)
+)
+_ACTIVE_RULES_FOR_USERS_STMT = _ACTIVE_RULES_STMT.where(
+    ManagementRule.user_id.in_(bindparam('user_ids', expanding=True))
+)
+_USER_RULES_STMT = select(ManagementRule).where(ManagementRule.user_id == bindparam('user_id'))
+_USER_RULE_STMT = select(ManagementRule).where(
+    ManagementRule.id == bindparam('rule_id'),
+    ManagementRule.user_id == bindparam('user_id')
+)
+
+def get_active_rules(user_ids=None):
+    """
+    Active rules as read-only rows (attribute access by column name), ordered by user_id.
+    Limited to `user_ids` when given.
+    """
+    if user_ids is None:
+        return db_session.execute(_ACTIVE_RULES_STMT).all()
+    return db_session.execute(_ACTIVE_RULES_FOR_USERS_STMT, {'user_ids': list(user_ids)}).all()
+
 def get_rules_for_user(user_id):
-    return ManagementRule.query.filter_by(user_id=user_id).all()
+    return db_session.execute(_USER_RULES_STMT, {'user_id': user_id}).scalars().all()
 
 def add_rule(user_id, symbol, exchange, product, exit_type, candle_condition=None, max_loss=None, target_profit=None, is_group_rule=False, included_positions=None):
     rule = ManagementRule(
@@ -117,9 +176,25 @@ def add_rule(user_id, symbol, exchange, product, exit_type, candle_condition=Non
     return rule
 
 def delete_rule(rule_id, user_id):
-    rule = ManagementRule.query.filter_by(id=rule_id, user_id=user_id).first()
+    rule = db_session.execute(_USER_RULE_STMT, {'rule_id': rule_id, 'user_id': user_id}).scalars().first()
     if rule:
         db_session.delete(rule)
         db_session.commit()
         return True
     return False
+
+def deactivate_rules(rule_ids):
+    """Deactivate the given rules in a single UPDATE and stamp last_triggered. Returns rows updated."""
+    if not rule_ids:
+        return 0
+    try:
+        result = db_session.execute(
+            update(ManagementRule)
+            .where(ManagementRule.id.in_(list(rule_ids)))
+            .values(is_active=False, last_triggered=datetime.now())
+        )
+        db_session.commit()
+        return result.rowcount
+    except Exception:
+        db_session.rollback()
+        raise
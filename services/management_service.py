@@ -1,17 +1,34 @@
 import threading
+import logging
 import time
+import math
+import queue
 import json
+import orjson
 import zmq
-import pandas as pd
+import numpy as np
 from datetime import datetime, time as dtime
 import pytz
-from database.management_db import ManagementRule, db_session, delete_rule
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import groupby
+from operator import attrgetter
+from database.management_db import db_session, get_active_rules, deactivate_rules
+from database.candle_db import save_candles
 from services.positionbook_service import get_positionbook
 from services.place_order_service import place_order
+from services.tick_store import TickStore
 from database.auth_db import get_auth_token_broker, get_api_key_for_tradingview as get_api_key_for_user
 from utils.logging import get_logger
+from utils.constants import NET_QTY_KEYS
 import os
 
+# Optional JIT for the rule trigger kernel; NumPy fallback is used without numba
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = prange = None
+
 # Import WebSocket Proxy instance for direct subscription
 try:
     from websocket_proxy.app_integration import _websocket_proxy_instance
@@ -20,293 +37,696 @@ except ImportError:
 
 logger = get_logger(__name__)
 
-# Cache for OHLCV data: {symbol: {ltp, open, high, low, close, volume}}
-ohlcv_cache = {}
+# Candle length; bars are aggregated per tick by tick_store
+CANDLE_BAR_MS = 60_000
+
+# Latest OHLCV fields, recent LTP history and OHLC bars per symbol, written by the tick loop
+tick_store = TickStore(bar_ms=CANDLE_BAR_MS)
 
-# Track subscribed symbols to avoid repeated calls: {user_id_exchange_symbol: timestamp}
+# Track subscribed symbols to avoid repeated calls: {(user_id, exchange, symbol): timestamp}
 subscribed_symbols = {}
 
+# Short-lived positionbook snapshots to avoid hitting the broker API every pass
+# {api_key: (fetched_at_monotonic, (success, response, status_code))}
+positionbook_cache = {}
+POSITIONBOOK_CACHE_TTL = float(os.getenv('MANAGEMENT_POSITIONBOOK_TTL', '2.0')) # seconds
+
+# Lookup structures and numeric columns of the current positionbook snapshot per API key,
+# built once per fetch: {api_key: (positions, positions_map, positions_by_product, columns)}
+position_snapshot_cache = {}
+
+# Rule pass cadence (seconds); passes with fewer than RULE_CHECK_FAST_MAX_RULES
+# active rules run on the fast period
+RULE_CHECK_FAST_PERIOD = 0.2
+RULE_CHECK_SLOW_PERIOD = 1.0
+RULE_CHECK_FAST_MAX_RULES = 50
+
+# Raw ZMQ topic bytes -> symbol, for ticks whose payload carries no symbol
+topic_symbols = {}
+
+# Raw (recv_ts_ms, topic, message) frames from the ZMQ receiver thread, consumed by tick_loop
+# Bounded: when tick_loop falls behind, the oldest frames are dropped (see tick_dropped_total)
+TICK_QUEUE_MAXSIZE = 50000
+tick_queue = queue.Queue(maxsize=TICK_QUEUE_MAXSIZE)
+tick_dropped_total = [0] # frames dropped since start, written only by the receiver thread
+ZMQ_RCVHWM = 1000
+
+# Longest single wait in the receiver. Under gunicorn's eventlet worker the
+# threads are green, so the receive must return regularly to let others run
+ZMQ_RCVTIMEO_MS = 100
+
+# Last closed 1-minute bar per watched symbol, read from tick_store.
+# New bars are also persisted to database.candle_db
+# {symbol: {'ts', 'open', 'high', 'low', 'close'}}
+candle_bars = {}
+CANDLE_LOOP_PERIOD = 1.0
+
+# Rule passes are driven by ticks on watched symbols; a full pass over every
+# active rule still runs at least this often (new positions, rules without ticks)
+RULE_FULL_CHECK_PERIOD = 5.0
+
+# Symbols with an open position under an active rule -> users to re-check on a tick
+# Rebuilt on every full pass: {symbol: {user_id, ...}}
+watched_users_by_symbol = {}
+
+# Users with a watched tick since their last check, filled by the tick loop
+pending_rule_users = set()
+_pending_rule_users_lock = threading.Lock()
+rules_wakeup = threading.Event()
+
+# Upper bound on concurrent exit orders per user
+EXIT_ORDER_WORKERS = 8
+
+IST = pytz.timezone('Asia/Kolkata')
+
+# Last market-hours result: [checked_at_monotonic, is_open]
+_market_open_cache = [-math.inf, False]
+MARKET_OPEN_CACHE_TTL = 1.0 # seconds
+
 def is_market_open():
     """Check if current time is within Indian Market hours (09:15 - 15:30 IST)"""
+    # Called from both management loops many times per second; the answer only
+    # changes at the open/close boundary, so reuse it for MARKET_OPEN_CACHE_TTL
+    checked_at = time.monotonic()
+    if checked_at - _market_open_cache[0] < MARKET_OPEN_CACHE_TTL:
+        return _market_open_cache[1]
+
     # Note: This hardcodes IST market hours. Future versions should support configurable hours/timezones.
     try:
-        tz = pytz.timezone('Asia/Kolkata')
-        now = datetime.now(tz)
+        now = datetime.now(IST)
 
         # Weekends (5=Sat, 6=Sun)
         if now.weekday() > 4:
-            return False
-
-        current_time = now.time()
-        market_start = dtime(9, 15)
-        market_end = dtime(15, 30)
+            is_open = False
+        else:
+            current_time = now.time()
+            market_start = dtime(9, 15)
+            market_end = dtime(15, 30)
 
-        return market_start <= current_time <= market_end
+            is_open = market_start <= current_time <= market_end
     except Exception as e:
-        logger.error(f"Error checking market hours: {e}")
+        logger.error("Error checking market hours: %s", e)
         return True # Fail open to avoid blocking if timezone fails
 
-def get_net_qty(p):
-    """Helper to safely get net quantity from position dictionary"""
-    for key in ['quantity', 'netqty', 'net_qty', 'qty']:
-        if key in p:
-            try:
-                return float(p[key])
-            except (ValueError, TypeError):
-                continue
-    return 0
+    _market_open_cache[0] = checked_at
+    _market_open_cache[1] = is_open
+    return is_open
 
-def calculate_pnl(pos):
-    """Calculate PnL for a position using cached LTP if available"""
-    # Default to API PnL
+def _to_float(value, default=np.nan):
+    """Helper to convert broker-supplied numeric fields, returning default when invalid"""
     try:
-        pnl = float(pos.get('pnl', 0))
+        return float(value)
     except (ValueError, TypeError):
-        pnl = 0.0
-
-    # Try to calculate more recent PnL using ZMQ cache
-    symbol = pos.get('symbol')
-    if symbol in ohlcv_cache and 'ltp' in ohlcv_cache[symbol]:
-        ltp = ohlcv_cache[symbol]['ltp']
-        net_qty = get_net_qty(pos)
+        return default
 
-        if 'netavgprc' in pos:
+def _parse_net_qty(p):
+    """Find the first numeric net quantity field in a raw position dictionary"""
+    for key in NET_QTY_KEYS:
+        if key in p:
             try:
-                avg_price = float(pos['netavgprc'])
-                # Basic PnL calculation
-                if net_qty > 0: # Long
-                    pnl = (ltp - avg_price) * net_qty
-                elif net_qty < 0: # Short
-                    pnl = (avg_price - ltp) * abs(net_qty)
+                return float(p[key])
             except (ValueError, TypeError):
-                pass
-    return pnl
+                continue
+    return 0.0
+
+def _normalize_positions(positions):
+    """
+    Annotate each position once per fetch with parsed numeric fields:
+    _netqty (float, 0.0 if absent) and _avgprc (float, NaN if absent/invalid)
+    """
+    for p in positions:
+        p['_netqty'] = _parse_net_qty(p)
+        p['_avgprc'] = _to_float(p.get('netavgprc'))
+    return positions
+
+def get_net_qty(p):
+    """Helper to get the normalized net quantity from a position dictionary"""
+    return p.get('_netqty', 0.0)
+
+def get_positionbook_cached(api_key, ttl=None):
+    """
+    Return get_positionbook() result, reusing a snapshot younger than `ttl` seconds
+    (POSITIONBOOK_CACHE_TTL by default). Rules still re-check quantities and use live
+    LTP for PnL, so a snapshot this old only delays noticing new/closed positions.
+    """
+    if ttl is None:
+        ttl = POSITIONBOOK_CACHE_TTL
+    now = time.monotonic()
+    cached = positionbook_cache.get(api_key)
+    if cached and now - cached[0] < ttl:
+        return cached[1]
+
+    result = get_positionbook(api_key=api_key)
+    # Only cache successful fetches so transient failures are retried next pass
+    if result[0]:
+        response = result[1]
+        if response and 'data' in response:
+            _normalize_positions(response['data'])
+        positionbook_cache[api_key] = (now, result)
+    return result
+
+def get_position_snapshot(api_key, positions):
+    """
+    Return lookup structures and numeric columns for a positionbook:
+      positions_map: {(symbol, product): index into positions}
+      positions_by_product: {product: [(symbol, index), ...]}
+      columns: (symbols, qty, avg, api_pnl), aligned with positions
+    Cached positionbook responses are reused between passes, so everything is
+    only rebuilt when `positions` is a new list (a refetch); every rule then
+    reads shared floats.
+    """
+    cached = position_snapshot_cache.get(api_key)
+    if cached and cached[0] is positions:
+        return cached[1:]
+
+    positions_map = {(p['symbol'], p['product']): i for i, p in enumerate(positions)}
+
+    # Index positions by product once so group rules only scan candidates
+    positions_by_product = defaultdict(list)
+    for (symbol, product), i in positions_map.items():
+        positions_by_product[product].append((symbol, i))
+
+    n = len(positions)
+    columns = (
+        [p.get('symbol') for p in positions],
+        np.fromiter((get_net_qty(p) for p in positions), dtype=np.float64, count=n),
+        np.fromiter((p.get('_avgprc', np.nan) for p in positions), dtype=np.float64, count=n),
+        np.fromiter((_to_float(p.get('pnl', 0), 0.0) for p in positions), dtype=np.float64, count=n),
+    )
+
+    position_snapshot_cache[api_key] = (positions, positions_map, positions_by_product, columns)
+    return positions_map, positions_by_product, columns
+
+def calculate_positions_pnl(symbols, qty, avg, api_pnl):
+    """
+    Calculate PnL for a positionbook's columns in one vectorized pass.
+    Uses cached LTP where available, falling back to the API-reported PnL.
+    Returns a float64 array aligned with the inputs.
+    """
+    ltp = tick_store.ltps(symbols)
+
+    # (ltp - avg) * qty covers both sides: shorts have negative qty
+    live = ~np.isnan(ltp) & ~np.isnan(avg) & (qty != 0)
+    return np.where(live, (ltp - avg) * qty, api_pnl)
+
+# Rule PnL is money: compare against thresholds at paise resolution
+PNL_DECIMALS = 2
+
+def sum_rule_pnl(position_pnl, rule_positions):
+    """
+    Total PnL per rule in one vectorized pass, quantized to PNL_DECIMALS (paise).
+    `rule_positions` holds a non-empty list of position indices per rule.
+    Returns a float64 array aligned with `rule_positions`.
+    """
+    if not rule_positions:
+        return np.empty(0, dtype=np.float64)
+
+    lengths = np.fromiter((len(m) for m in rule_positions), dtype=np.int64, count=len(rule_positions))
+    flat = np.fromiter((i for m in rule_positions for i in m), dtype=np.int64, count=int(lengths.sum()))
+    offsets = np.zeros(len(lengths), dtype=np.int64)
+    np.cumsum(lengths[:-1], out=offsets[1:])
+    # Quantize so float drift (e.g. -499.99999999 from summed legs) can't decide a threshold
+    return np.round(np.add.reduceat(position_pnl[flat], offsets), PNL_DECIMALS)
 
 def start_management_service():
-    """Starts the background thread for management service"""
-    thread = threading.Thread(target=management_loop, daemon=True)
-    thread.start()
+    """Starts the background threads for management service"""
+    # Tick ingestion and rule checks run independently so a slow rule pass
+    # (broker API calls, order placement) never delays cache updates
+    threading.Thread(target=tick_recv_loop, name="management-zmq", daemon=True).start()
+    threading.Thread(target=tick_loop, name="management-ticks", daemon=True).start()
+    threading.Thread(target=rule_loop, name="management-rules", daemon=True).start()
+    threading.Thread(target=candle_loop, name="management-candles", daemon=True).start()
     logger.info("Management Service Started")
 
-def management_loop():
-    """Main loop to monitor positions and rules"""
+def tick_recv_loop():
+    """Receive market data from ZMQ (blocking) and hand raw frames to tick_loop"""
 
-    # ZMQ Subscriber setup
-    context = zmq.Context()
+    # ZMQ Subscriber setup on the process-wide context
+    context = zmq.Context.instance()
     socket = context.socket(zmq.SUB)
     ZMQ_HOST = os.getenv('ZMQ_HOST', '127.0.0.1')
     ZMQ_PORT = os.getenv('ZMQ_PORT', '5555')
+    # Socket-side buffer only covers this thread being descheduled; the backlog
+    # behind a slow tick_loop is bounded by tick_queue.
+    # CONFLATE is not an option: ticks are multipart (topic, payload)
+    socket.setsockopt(zmq.RCVHWM, ZMQ_RCVHWM)
+    socket.setsockopt(zmq.RCVTIMEO, ZMQ_RCVTIMEO_MS)
     socket.connect(f"tcp://{ZMQ_HOST}:{ZMQ_PORT}")
     socket.setsockopt(zmq.SUBSCRIBE, b"")
 
-    # Poller to check for ZMQ messages without blocking indefinitely
-    poller = zmq.Poller()
-    poller.register(socket, zmq.POLLIN)
+    logger.info("Management Service connected to ZMQ at %s:%s", ZMQ_HOST, ZMQ_PORT)
 
-    logger.info(f"Management Service connected to ZMQ at {ZMQ_HOST}:{ZMQ_PORT}")
+    while True:
+        try:
+            # Blocks until a tick arrives (or RCVTIMEO): no polling interval
+            topic, message = socket.recv_multipart()
+            # Stamp on arrival so bars use receive time, not when tick_loop dequeues
+            frame = (time.time_ns() // 1_000_000, topic, message)
+            try:
+                tick_queue.put_nowait(frame)
+            except queue.Full:
+                # Drop the oldest frame; this thread is the only producer, so the
+                # slot freed here is still free for the put below
+                try:
+                    tick_queue.get_nowait()
+                    tick_dropped_total[0] += 1
+                except queue.Empty:
+                    pass
+                tick_queue.put_nowait(frame)
+        except zmq.Again:
+            # Idle: yield (a no-op outside eventlet) and wait again
+            time.sleep(0)
+        except Exception as e:
+            logger.error("Error in management tick receiver: %s", e)
+            time.sleep(1)
+
+def tick_loop():
+    """Apply queued ticks to tick_store and wake the rule loop for watched symbols"""
 
     # State tracking for logging
-    market_was_open = False
     last_log_time = time.time()
     tick_count = 0
+    # tick_dropped_total as of the last heartbeat; only the receiver writes the counter
+    dropped_logged = 0
 
     while True:
         try:
+            # Short timeout only so the heartbeat below still runs when idle
+            try:
+                frames = [tick_queue.get(timeout=1.0)]
+            except queue.Empty:
+                frames = []
+
+            # Drain everything queued since the last pass so the cache never lags
+            # behind the publisher
+            while True:
+                try:
+                    frames.append(tick_queue.get_nowait())
+                except queue.Empty:
+                    break
+
             current_market_status = is_market_open()
 
-            # Log transitions
-            if current_market_status and not market_was_open:
-                logger.info("Market is now OPEN (IST). Resuming data processing and rule checks.")
-            elif not current_market_status and market_was_open:
-                logger.info("Market is now CLOSED (IST). Pausing processing.")
+            # Users whose watched symbols ticked in this batch
+            users_to_check = set()
 
-            market_was_open = current_market_status
+            # Update cache only during market hours (as per requirement)
+            if current_market_status:
+                # Every tick is applied in arrival order: bars are aggregated from each one
+                for recv_ts_ms, topic, message in frames:
+                    symbol = process_market_data(topic, message, recv_ts_ms)
+                    tick_count += 1
 
-            # 1. Check ZMQ for market data updates (non-blocking or short timeout)
-            socks = dict(poller.poll(100)) # 100ms timeout
-            if socket in socks and socks[socket] == zmq.POLLIN:
-                topic, message = socket.recv_multipart()
+                    users = watched_users_by_symbol.get(symbol)
+                    if users:
+                        users_to_check.update(users)
 
-                # Update cache only during market hours (as per requirement)
-                if current_market_status:
-                    process_market_data(topic, message)
-                    tick_count += 1
+            # Wake the rule loop for just the affected users
+            if users_to_check:
+                with _pending_rule_users_lock:
+                    pending_rule_users.update(users_to_check)
+                rules_wakeup.set()
 
             # Periodic Heartbeat Log (every 60s) during market hours
             if current_market_status and time.time() - last_log_time > 60:
                 if tick_count > 0:
-                    logger.info(f"Management Service Active: Processed {tick_count} market data ticks in last minute.")
+                    logger.info("Management Service Active: Processed %s market data ticks in last minute.", tick_count)
                 else:
                     logger.info("Management Service Active: No market data received in last minute (waiting for ticks).")
+                dropped = tick_dropped_total[0]
+                if dropped != dropped_logged:
+                    logger.warning("Management Service falling behind: dropped %s queued ticks in last minute.", dropped - dropped_logged)
+                    dropped_logged = dropped
                 tick_count = 0
                 last_log_time = time.time()
 
-            # 2. Every few seconds, check rules against current state
+        except Exception as e:
+            logger.error("Error in management tick loop: %s", e)
+            time.sleep(1)
+
+def rule_check_period(rule_count):
+    """Target seconds between rule passes: fast for small rule sets, relaxed for large ones"""
+    if rule_count < RULE_CHECK_FAST_MAX_RULES:
+        return RULE_CHECK_FAST_PERIOD
+    return RULE_CHECK_SLOW_PERIOD
+
+def candle_loop():
+    """
+    Rebuild the last closed bar of each watched symbol once per bar boundary and
+    persist new bars to the candle store
+    """
+    last_boundary = None
+    market_was_open = False
+    dropped_at_boundary = tick_dropped_total[0]
+
+    while True:
+        try:
+            now_ms = time.time_ns() // 1_000_000
+            boundary = now_ms // CANDLE_BAR_MS
+            market_open = is_market_open()
+
+            # Bars only close on a boundary; nothing to do in between.
+            # One more pass after the close picks up the session's last bar
+            if boundary != last_boundary and (market_open or market_was_open):
+                new_bars = []
+                for symbol in list(watched_users_by_symbol):
+                    bar = tick_store.last_closed_bar(symbol, now_ms)
+                    if bar is None:
+                        continue
+                    previous = candle_bars.get(symbol)
+                    # A symbol's first bar only starts at its first tick, so it is not persisted
+                    if ((previous is None or previous['ts'] != bar['ts'])
+                            and not tick_store.is_first_bar(symbol, bar['ts'])):
+                        new_bars.append((symbol, bar))
+                    candle_bars[symbol] = bar
+
+                # Bars that missed dropped ticks stay in memory but are not persisted
+                dropped = tick_dropped_total[0]
+                if dropped == dropped_at_boundary:
+                    save_candles(new_bars)
+                elif new_bars:
+                    logger.warning("Skipping %s candle(s): ticks were dropped during the bar.", len(new_bars))
+                dropped_at_boundary = dropped
+                last_boundary = boundary
+                market_was_open = market_open
+
+        except Exception as e:
+            logger.error("Error in Management Candle Loop: %s", e)
+
+        time.sleep(CANDLE_LOOP_PERIOD)
+
+def _take_pending_rule_users():
+    """Atomically take and clear the set of users flagged by the tick loop"""
+    with _pending_rule_users_lock:
+        users = set(pending_rule_users)
+        pending_rule_users.clear()
+    return users
+
+def rule_loop():
+    """
+    Check rules against the current cache and positions while the market is open.
+    Ticks on watched symbols trigger a pass for just the affected users; a full pass
+    over all active rules runs every RULE_FULL_CHECK_PERIOD as a fallback.
+    """
+
+    # State tracking for logging
+    market_was_open = False
+    last_full_check = -math.inf
+    rule_count = 0
+
+    while True:
+        try:
+            current_market_status = is_market_open()
+
+            # Log transitions
+            if current_market_status and not market_was_open:
+                logger.info("Market is now OPEN (IST). Resuming data processing and rule checks.")
+            elif not current_market_status and market_was_open:
+                logger.info("Market is now CLOSED (IST). Pausing processing.")
+
+            market_was_open = current_market_status
+
             # Only check rules if market is open
             if current_market_status:
-                check_rules()
+                started = time.monotonic()
+                if started - last_full_check >= RULE_FULL_CHECK_PERIOD:
+                    _take_pending_rule_users()
+                    rule_count = check_rules()
+                    last_full_check = started
+                else:
+                    user_ids = _take_pending_rule_users()
+                    if user_ids:
+                        check_rules(user_ids)
+
+                # Rate limit checks: sleep only for what is left of the target period
+                elapsed = time.monotonic() - started
+                time.sleep(max(0.0, rule_check_period(rule_count) - elapsed))
+
+                # Then wait for a watched tick, or until the next full pass is due
+                rules_wakeup.wait(max(0.0, last_full_check + RULE_FULL_CHECK_PERIOD - time.monotonic()))
+                rules_wakeup.clear()
             else:
                 # Sleep a bit longer if market is closed to save CPU
                 time.sleep(5)
 
         except Exception as e:
-            logger.error(f"Error in management loop: {e}")
+            logger.error("Error in management rule loop: %s", e)
             time.sleep(1)
 
-def process_market_data(topic, message):
-    """Update cache with latest market data"""
+def process_market_data(topic, message, ts_ms=None):
+    """
+    Update cache with latest market data, stamped with `ts_ms` (epoch ms receive
+    time, now if None). Returns the tick's symbol, or None.
+    """
     try:
-        topic_str = topic.decode('utf-8')
-        data = json.loads(message.decode('utf-8'))
+        # orjson parses the raw bytes directly, no intermediate str
+        data = orjson.loads(message)
 
-        # Topic format: BROKER_EXCHANGE_SYMBOL_MODE or EXCHANGE_SYMBOL_MODE
-        parts = topic_str.split('_')
-        # Simplified: grab symbol from parts or data
-        symbol = data.get('symbol') or (parts[-2] if len(parts) >= 3 else None)
+        # Simplified: grab symbol from data, falling back to the topic
+        symbol = data.get('symbol')
+        if not symbol:
+            # Topic format: BROKER_EXCHANGE_SYMBOL_MODE or EXCHANGE_SYMBOL_MODE.
+            # Topics repeat per symbol/mode, so each is split only once
+            symbol = topic_symbols.get(topic)
+            if symbol is None:
+                parts = topic.split(b'_')
+                symbol = parts[-2].decode('utf-8') if len(parts) >= 3 else None
+                if symbol:
+                    topic_symbols[topic] = symbol
 
         if not symbol:
             return
 
-        # Update cache with available fields
-        if symbol not in ohlcv_cache:
-            ohlcv_cache[symbol] = {}
-
-        # Standardize and store fields
-        if 'ltp' in data: ohlcv_cache[symbol]['ltp'] = float(data['ltp'])
-        if 'open' in data: ohlcv_cache[symbol]['open'] = float(data['open'])
-        if 'high' in data: ohlcv_cache[symbol]['high'] = float(data['high'])
-        if 'low' in data: ohlcv_cache[symbol]['low'] = float(data['low'])
-        if 'close' in data: ohlcv_cache[symbol]['close'] = float(data['close'])
-        if 'volume' in data: ohlcv_cache[symbol]['volume'] = float(data['volume'])
+        # Store whitelisted OHLCV fields and append LTP to the symbol's ring
+        tick_store.update(symbol, data, ts_ms)
+        return symbol
 
     except Exception as e:
-        logger.error(f"Error processing market data: {e}")
-
-def check_rules():
-    """Iterate over active rules and check conditions"""
+        logger.error("Error processing market data: %s", e)
+
+# Rule trigger outcomes returned by evaluate_rule_triggers
+TRIGGER_NONE = 0
+TRIGGER_TARGET_PROFIT = 1
+TRIGGER_MAX_LOSS = 2
+
+def _evaluate_rule_triggers_numpy(pnl, target_profit, max_loss):
+    """NumPy fallback for evaluate_rule_triggers when numba is unavailable"""
+    return np.where(
+        pnl >= target_profit, TRIGGER_TARGET_PROFIT,
+        np.where((pnl < 0) & (-pnl >= max_loss), TRIGGER_MAX_LOSS, TRIGGER_NONE)
+    ).astype(np.int8)
+
+# Rule count per call above which the parallel kernel is worth its thread startup
+PARALLEL_TRIGGER_MIN_RULES = 10000
+
+if njit is not None:
+    @njit(cache=True)
+    def _rule_trigger(pnl, target_profit, max_loss):
+        """Trigger outcome for one rule; shared by the serial and parallel kernels"""
+        if pnl >= target_profit:
+            return TRIGGER_TARGET_PROFIT
+        if pnl < 0 and -pnl >= max_loss:
+            return TRIGGER_MAX_LOSS
+        return TRIGGER_NONE
+
+    # Eagerly compiled for the only signature used, cached on disk, so the first
+    # rule pass is not JIT-cold
+    @njit('int8[:](float64[:], float64[:], float64[:])', cache=True)
+    def _evaluate_rule_triggers_serial(pnl, target_profit, max_loss):
+        n = pnl.shape[0]
+        out = np.zeros(n, np.int8)
+        for i in range(n):
+            out[i] = _rule_trigger(pnl[i], target_profit[i], max_loss[i])
+        return out
+
+    @njit('int8[:](float64[:], float64[:], float64[:])', cache=True, parallel=True)
+    def _evaluate_rule_triggers_parallel(pnl, target_profit, max_loss):
+        n = pnl.shape[0]
+        out = np.zeros(n, np.int8)
+        for i in prange(n):
+            out[i] = _rule_trigger(pnl[i], target_profit[i], max_loss[i])
+        return out
+
+    def evaluate_rule_triggers(pnl, target_profit, max_loss):
+        """
+        Decide which rules fire, one entry per rule:
+        TRIGGER_TARGET_PROFIT if pnl >= target_profit, else TRIGGER_MAX_LOSS if the
+        loss reaches max_loss, else TRIGGER_NONE. NaN thresholds disable a check.
+        Spreads across cores once there are PARALLEL_TRIGGER_MIN_RULES rules.
+        """
+        if pnl.shape[0] >= PARALLEL_TRIGGER_MIN_RULES:
+            return _evaluate_rule_triggers_parallel(pnl, target_profit, max_loss)
+        return _evaluate_rule_triggers_serial(pnl, target_profit, max_loss)
+else:
+    evaluate_rule_triggers = _evaluate_rule_triggers_numpy
+
+def _parse_included_positions(rule):
+    """Symbols of a custom group rule as a set, or None for prefix matching (unset or invalid)"""
+    if not rule.included_positions:
+        return None
+    try:
+        included_list = json.loads(rule.included_positions)
+    except ValueError:
+        logger.error("Failed to parse included_positions for rule %s", rule.id)
+        return None
+    if not isinstance(included_list, list):
+        logger.error("included_positions for rule %s is not a list", rule.id)
+        return None
+    return {s for s in included_list if isinstance(s, str)}
+
+def match_group_rule_prefixes(group_rules, positions_by_product):
+    """
+    Match prefix-based group rules against positions in a single pass.
+    Returns {rule_id: [position index, ...]} for positions whose symbol starts with
+    the rule symbol and whose product equals the rule product.
+    Cost is O(positions x distinct prefix lengths) rather than O(rules x positions).
+    """
+    rule_ids_by_prefix = defaultdict(list) # (product, prefix) -> [rule_id, ...]
+    prefix_lengths = defaultdict(set) # product -> {len(prefix), ...}
+    for rule in group_rules:
+        rule_ids_by_prefix[(rule.product, rule.symbol)].append(rule.id)
+        prefix_lengths[rule.product].add(len(rule.symbol))
+
+    matches = defaultdict(list)
+    for product, lengths in prefix_lengths.items():
+        for sym, i in positions_by_product.get(product, ()):
+            for length in lengths:
+                for rule_id in rule_ids_by_prefix.get((product, sym[:length]), ()):
+                    matches[rule_id].append(i)
+    return matches
+
+def check_rules(user_ids=None):
+    """
+    Iterate over active rules and check conditions, for all users or only `user_ids`.
+    Returns the number of active rules checked.
+    """
+    global watched_users_by_symbol
+    rules = ()
     try:
-        # Create a new session for thread safety
-        session = db_session()
-        rules = session.query(ManagementRule).filter_by(is_active=True).all()
-
-        # Group rules by user_id to minimize API calls
-        rules_by_user = {}
-        for rule in rules:
-            if rule.user_id not in rules_by_user:
-                rules_by_user[rule.user_id] = []
-            rules_by_user[rule.user_id].append(rule)
-
-        for user_id, user_rules in rules_by_user.items():
+        # Ordered by user so rules can be grouped in a single pass (one API call per user)
+        rules = get_active_rules(user_ids)
+
+        # Symbols with evaluated positions this pass -> users, for tick-driven passes
+        users_by_symbol = defaultdict(set)
+
+        # Rules whose exit orders were placed this pass; deactivated together at the end
+        triggered_rule_ids = set()
+
+        for user_id, user_rules in groupby(rules, key=attrgetter('user_id')):
+            user_rules = list(user_rules)
             try:
-                # Fetch positions once per user (API call)
-                # TODO: In V2, cache this result for X seconds to respect rate limits further
+                # Fetch positions once per user (API call, cached for a short TTL)
                 api_key = get_api_key_for_user(user_id)
                 if not api_key: continue
 
-                success, response, _ = get_positionbook(api_key=api_key)
+                success, response, _ = get_positionbook_cached(api_key)
                 if not success or not response or 'data' not in response: continue
 
-                # Create a map for fast position lookup
-                # Key: symbol_product (e.g. INF_MIS)
-                positions_map = {f"{p['symbol']}_{p['product']}": p for p in response['data']}
-
-                # Collect symbols to subscribe
+                positions = response['data']
+                positions_map, positions_by_product, columns = get_position_snapshot(api_key, positions)
+
+                # PnL and open flag for every position at once, indexed like `positions`
+                symbols, qty, avg, api_pnl = columns
+                position_pnl = calculate_positions_pnl(symbols, qty, avg, api_pnl)
+                is_open = qty != 0
+
+                group_rules = [r for r in user_rules if r.is_group_rule]
+                individual_rules = [r for r in user_rules if not r.is_group_rule]
+
+                # Resolve all prefix group rules for this user in one pass over positions
+                group_matches = match_group_rule_prefixes(group_rules, positions_by_product)
+
+                # Pre-validate individual rules at once: position exists and is open
+                rule_pos_idx = np.fromiter(
+                    (positions_map.get((r.symbol, r.product), -1) for r in individual_rules),
+                    dtype=np.int64, count=len(individual_rules)
+                )
+                valid = rule_pos_idx >= 0
+                valid[valid] = is_open[rule_pos_idx[valid]]
+
+                # Rules with open positions this pass: [(rule, matching position indices, max_loss)]
+                candidates_by_rule = []
+
+                # --- Group Rule Logic ---
+                for rule in group_rules:
+                    # Custom Group: explicit symbol list overrides prefix matching
+                    included_set = _parse_included_positions(rule)
+                    if included_set:
+                        candidates = [i for i in positions_map.values()
+                                      if positions[i]['symbol'] in included_set]
+                    else:
+                        # Default Group: Prefix match on symbol within the rule's product
+                        candidates = group_matches.get(rule.id, ())
+
+                    matching = [i for i in candidates if is_open[i]]
+                    if matching:
+                        # Combined max loss applies regardless of exit_type
+                        max_loss = abs(rule.max_loss) if rule.max_loss else np.nan
+                        candidates_by_rule.append((rule, matching, max_loss))
+
+                # --- Individual Rule Logic ---
+                for k in np.flatnonzero(valid):
+                    rule = individual_rules[k]
+                    max_loss = (rule.max_loss if rule.exit_type in ['TOTAL_LOSS', 'BOTH'] and rule.max_loss
+                                else np.nan)
+                    candidates_by_rule.append((rule, [int(rule_pos_idx[k])], max_loss))
+
+                # Collect symbols for subscription and tick-driven re-checks
                 symbols_to_subscribe = set()
-
-                for rule in user_rules:
-                    try:
-                        # --- Group Rule Logic ---
-                        if rule.is_group_rule:
-                            matching_positions = []
-                            group_pnl = 0.0
-
-                            # Parse custom included list if available
-                            included_list = None
-                            if rule.included_positions:
-                                try:
-                                    included_list = json.loads(rule.included_positions)
-                                except:
-                                    logger.error(f"Failed to parse included_positions for rule {rule.id}")
-
-                            # Iterate all positions to find matches
-                            for p_key, p_data in positions_map.items():
-                                is_match = False
-
-                                if included_list:
-                                    # Custom Group: Check if symbol is in the list
-                                    if p_data['symbol'] in included_list:
-                                        is_match = True
-                                else:
-                                    # Default Group: Prefix match on symbol AND Product
-                                    if p_data['symbol'].startswith(rule.symbol) and p_data['product'] == rule.product:
-                                        is_match = True
-
-                                if is_match:
-                                    qty = get_net_qty(p_data)
-                                    if qty != 0:
-                                        matching_positions.append(p_data)
-                                        group_pnl += calculate_pnl(p_data)
-
-                                        # Collect symbol for subscription
-                                        if 'exchange' in p_data and 'symbol' in p_data:
-                                            symbols_to_subscribe.add((p_data['symbol'], p_data['exchange']))
-
-                            if not matching_positions:
-                                continue
-
-                            # Check Target Profit
-                            if rule.target_profit and group_pnl >= rule.target_profit:
-                                logger.info(f"Group Target Profit Triggered for {rule.symbol}: PnL {group_pnl} >= {rule.target_profit}")
-                                for pos in matching_positions:
-                                    execute_exit(rule, pos, api_key, f"Group Target Profit: {group_pnl}")
-
-                            # Check Max Loss (Combined)
-                            elif rule.max_loss and group_pnl <= -abs(rule.max_loss):
-                                logger.info(f"Group Max Loss Triggered for {rule.symbol}: PnL {group_pnl} <= -{rule.max_loss}")
-                                for pos in matching_positions:
-                                    execute_exit(rule, pos, api_key, f"Group Max Loss: {group_pnl}")
-
-                        # --- Individual Rule Logic ---
+                for rule, matching, max_loss in candidates_by_rule:
+                    for i in matching:
+                        p_data = positions[i]
+                        if 'exchange' in p_data:
+                            symbols_to_subscribe.add((p_data['symbol'], p_data['exchange']))
+                            users_by_symbol[p_data['symbol']].add(user_id)
+
+                    # Check Candle Close
+                    if rule.exit_type in ['CANDLE_CLOSE', 'BOTH']:
+                        # Requires candle engine.
+                        # Using LTP from position vs EMA is risky without confirmed close.
+                        # We will log that we are skipping this check until Candle Engine is available.
+                        # logger.debug(f"Skipping Candle Close check for {rule.symbol} - Engine not ready")
+                        pass
+
+                # Kernel inputs straight from the rule rows, one entry per evaluated rule
+                n_rules = len(candidates_by_rule)
+                evaluated_rules = [c[0] for c in candidates_by_rule]
+                rule_positions = [c[1] for c in candidates_by_rule] # matching position indices
+                # NaN disables a check
+                rule_target = np.fromiter((r.target_profit or np.nan for r in evaluated_rules),
+                                          dtype=np.float64, count=n_rules)
+                rule_max_loss = np.fromiter((c[2] for c in candidates_by_rule), dtype=np.float64, count=n_rules)
+
+                # Evaluate Target Profit / Max Loss for all of this user's rules at once
+                rule_pnl = sum_rule_pnl(position_pnl, rule_positions)
+                triggers = evaluate_rule_triggers(rule_pnl, rule_target, rule_max_loss)
+
+                # Exit orders for this user: [(rule, position, reason), ...]
+                exits = []
+                for k in np.flatnonzero(triggers):
+                    rule = evaluated_rules[k]
+                    pnl = float(rule_pnl[k])
+                    is_target = triggers[k] == TRIGGER_TARGET_PROFIT
+
+                    if rule.is_group_rule:
+                        if is_target:
+                            logger.info("Group Target Profit Triggered for %s: PnL %s >= %s", rule.symbol, pnl, rule.target_profit)
+                            reason = f"Group Target Profit: {pnl}"
+                        else:
+                            logger.info("Group Max Loss Triggered for %s: PnL %s <= -%s", rule.symbol, pnl, rule.max_loss)
+                            reason = f"Group Max Loss: {pnl}"
+                    else:
+                        if is_target:
+                            logger.info("Target Profit Triggered for %s: PnL %s >= %s", rule.symbol, pnl, rule.target_profit)
+                            reason = "Target Profit Triggered"
                         else:
-                            pos_key = f"{rule.symbol}_{rule.product}"
-                            pos = positions_map.get(pos_key)
-
-                            if not pos:
-                                continue
-
-                            net_qty = get_net_qty(pos)
-                            if net_qty == 0:
-                                continue
-
-                            # Collect symbol for subscription
-                            if 'exchange' in pos and 'symbol' in pos:
-                                symbols_to_subscribe.add((pos['symbol'], pos['exchange']))
-
-                            # Calculate PnL
-                            pnl = calculate_pnl(pos)
-
-                            # Check Target Profit (Individual)
-                            if rule.target_profit and pnl >= rule.target_profit:
-                                logger.info(f"Target Profit Triggered for {rule.symbol}: PnL {pnl} >= {rule.target_profit}")
-                                execute_exit(rule, pos, api_key, "Target Profit Triggered")
-
-                            # Check Total Loss (Individual)
-                            elif rule.exit_type in ['TOTAL_LOSS', 'BOTH'] and rule.max_loss:
-                                # If PnL is negative and absolute value > max_loss
-                                if pnl < 0 and abs(pnl) >= rule.max_loss:
-                                    logger.info(f"Total Loss Triggered for {rule.symbol}: PnL {pnl} <= -{rule.max_loss}")
-                                    execute_exit(rule, pos, api_key, "Max Loss Triggered")
-
-                        # Check Candle Close
-                        if rule.exit_type in ['CANDLE_CLOSE', 'BOTH']:
-                            # Requires candle engine.
-                            # Using LTP from position vs EMA is risky without confirmed close.
-                            # We will log that we are skipping this check until Candle Engine is available.
-                            # logger.debug(f"Skipping Candle Close check for {rule.symbol} - Engine not ready")
-                            pass
+                            logger.info("Total Loss Triggered for %s: PnL %s <= -%s", rule.symbol, pnl, rule.max_loss)
+                            reason = "Max Loss Triggered"
 
-                    except Exception as e:
-                        logger.error(f"Error checking rule {rule.id}: {e}")
+                    for i in rule_positions[k]:
+                        exits.append((rule, positions[i], reason))
+
+                triggered_rule_ids.update(execute_exits(exits, api_key))
 
                 # Trigger subscriptions for this user
                 if symbols_to_subscribe and _websocket_proxy_instance:
@@ -317,27 +737,70 @@ def check_rules():
                             current_time = time.time()
 
                             for sym, exc in symbols_to_subscribe:
-                                sub_key = f"{user_id}_{exc}_{sym}"
+                                sub_key = (user_id, exc, sym)
                                 # Subscribe if not subscribed recently (refresh every 5 mins)
-                                if sub_key not in subscribed_symbols or current_time - subscribed_symbols[sub_key] > 300:
+                                if current_time - subscribed_symbols.get(sub_key, -math.inf) > 300:
                                     # Subscribe to Quote mode (2) which includes LTP
-                                    logger.info(f"Management Service subscribing to {sym} ({exc})")
+                                    logger.info("Management Service subscribing to %s (%s)", sym, exc)
                                     adapter.subscribe(sym, exc, 2)
                                     subscribed_symbols[sub_key] = current_time
                     except Exception as e:
-                        logger.error(f"Error triggering subscription: {e}")
+                        logger.error("Error triggering subscription: %s", e)
 
             except Exception as e:
-                logger.error(f"Error processing rules for user {user_id}: {e}")
+                logger.error("Error processing rules for user %s: %s", user_id, e)
 
-        session.close()
-        time.sleep(1) # Rate limit checks
+        if user_ids is None:
+            watched_users_by_symbol = dict(users_by_symbol)
+        else:
+            for symbol, users in users_by_symbol.items():
+                watched_users_by_symbol.setdefault(symbol, set()).update(users)
+
+        # Deactivate all triggered rules in one transaction to prevent duplicate orders
+        if triggered_rule_ids:
+            try:
+                deactivate_rules(triggered_rule_ids)
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("Deactivated %s rule(s) after exit execution: %s",
+                                len(triggered_rule_ids), sorted(triggered_rule_ids))
+            except Exception as e:
+                logger.error("Error deactivating triggered rules %s: %s", sorted(triggered_rule_ids), e)
 
     except Exception as e:
-        logger.error(f"Error in check_rules: {e}")
+        logger.error("Error in check_rules: %s", e)
+        # Discard a session possibly left mid-transaction; the registry opens a fresh one next pass
+        db_session.remove()
+
+    else:
+        # End this pass's transaction so the next pass sees fresh rows, but keep the
+        # thread-local session (scoped_session registry) alive for reuse
+        db_session.rollback()
+
+    return len(rules)
+
+def execute_exits(exits, api_key):
+    """
+    Place a user's exit orders concurrently so N exits cost about one broker round trip.
+    `exits` is a list of (rule, position, reason). Returns ids of rules with a placed order.
+    """
+    if not exits:
+        return set()
+
+    with ThreadPoolExecutor(max_workers=min(EXIT_ORDER_WORKERS, len(exits))) as executor:
+        placed = list(executor.map(
+            lambda e: execute_exit(e[0], e[1], api_key, e[2]), exits
+        ))
+
+    # Positions changed; force a fresh positionbook on the next pass
+    positionbook_cache.pop(api_key, None)
+
+    return {rule.id for (rule, _, _), ok in zip(exits, placed) if ok}
 
 def execute_exit(rule, position, api_key, reason):
-    """Place exit order"""
+    """
+    Place exit order. Returns True if the order was placed.
+    The caller is responsible for deactivating the rule.
+    """
     try:
         net_qty = get_net_qty(position)
         qty = abs(int(net_qty))
@@ -357,22 +820,15 @@ def execute_exit(rule, position, api_key, reason):
             'tag': 'MANAGEMENT_EXIT'
         }
 
-        logger.info(f"Executing Management Exit for {payload['symbol']} (Rule: {rule.symbol}): {reason}")
-        place_order(payload)
-
-        # Deactivate rule immediately to prevent duplicate orders
-        # We must use a new session or commit the passed object if attached
-        # Since 'rule' is from a session in check_rules, we can commit that session or use a fresh one.
-        # But check_rules closes the session.
+        logger.info("Executing Management Exit for %s (Rule: %s): %s", payload['symbol'], rule.symbol, reason)
+        success, response, status_code = place_order(payload)
+        if not success:
+            logger.error("Management Exit order rejected for %s (Rule: %s): %s %s",
+                         payload['symbol'], rule.symbol, status_code, response)
+            return False
 
-        # Simplest way: update status in DB directly
-        session = db_session()
-        r = session.query(ManagementRule).filter_by(id=rule.id).first()
-        if r:
-            r.is_active = False
-            session.commit()
-            logger.info(f"Rule {rule.id} deactivated after exit execution")
-        session.close()
+        return True
 
     except Exception as e:
-        logger.error(f"Error executing exit: {e}")
+        logger.error("Error executing exit: %s", e)
+        return False
@@ -0,0 +1,201 @@
+"""
+Struct-of-arrays tick store for the management service.
+Keeps the latest OHLCV fields per symbol, a fixed-size LTP history ring and
+OHLC bars aggregated per tick, so the hot tick path writes into preallocated
+arrays instead of allocating dicts.
+"""
+
+import time
+import numpy as np
+
+# Column layout of TickStore.latest
+OHLCV_FIELDS = ('ltp', 'open', 'high', 'low', 'close', 'volume')
+OHLCV_FIELD_IDX = {name: i for i, name in enumerate(OHLCV_FIELDS)}
+LTP_IDX = OHLCV_FIELD_IDX['ltp']
+
+# Column layout of the bar arrays
+BAR_OPEN, BAR_HIGH, BAR_LOW, BAR_CLOSE = range(4)
+
+class TickStore:
+    """
+    Per-symbol market data stored column-wise:
+      latest:   float64[capacity, len(OHLCV_FIELDS)] latest value of each field (NaN until seen)
+      ring_ltp: float64[capacity, history] last `history` LTPs per symbol
+      ring_ts:  int64[capacity, history] receive time (epoch ms) of each ring entry
+      head:     int64[capacity] total LTP writes per symbol; next ring index is head % history
+      bar, prev_bar:       float64[capacity, 4] OHLC of the current and the previous bar
+      bar_ts, prev_bar_ts: int64[capacity] end time (epoch ms) of those bars, 0 if none
+      first_bar_ts:        int64[capacity] end time of the first bar built per symbol
+
+    Bars are `bar_ms` long and right-closed: a tick at exactly a boundary belongs to the
+    bar ending there, and a bar is labelled with its end time. They are built from every
+    tick, so they do not depend on how much of the bar still fits in the ring.
+
+    Symbols get a slot on first sight; arrays double in size when full.
+    Designed for a single writer thread. Readers may run concurrently and see
+    either the previous or the new value of a field.
+    """
+
+    def __init__(self, capacity=256, history=512, bar_ms=60_000):
+        self.history = history
+        self.bar_ms = bar_ms
+        self.slots = {} # symbol -> slot
+        self.symbols = [] # slot -> symbol
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        latest = np.full((capacity, len(OHLCV_FIELDS)), np.nan)
+        ring_ltp = np.empty((capacity, self.history), np.float64)
+        ring_ts = np.zeros((capacity, self.history), np.int64)
+        head = np.zeros(capacity, np.int64)
+        bar = np.full((capacity, 4), np.nan)
+        prev_bar = np.full((capacity, 4), np.nan)
+        bar_ts = np.zeros(capacity, np.int64)
+        prev_bar_ts = np.zeros(capacity, np.int64)
+        first_bar_ts = np.zeros(capacity, np.int64)
+
+        # Copy existing rows before publishing the new arrays
+        n = len(self.symbols)
+        if n:
+            latest[:n] = self.latest[:n]
+            ring_ltp[:n] = self.ring_ltp[:n]
+            ring_ts[:n] = self.ring_ts[:n]
+            head[:n] = self.head[:n]
+            bar[:n] = self.bar[:n]
+            prev_bar[:n] = self.prev_bar[:n]
+            bar_ts[:n] = self.bar_ts[:n]
+            prev_bar_ts[:n] = self.prev_bar_ts[:n]
+            first_bar_ts[:n] = self.first_bar_ts[:n]
+
+        self.latest, self.ring_ltp, self.ring_ts, self.head = latest, ring_ltp, ring_ts, head
+        self.bar, self.prev_bar, self.bar_ts, self.prev_bar_ts = bar, prev_bar, bar_ts, prev_bar_ts
+        self.first_bar_ts = first_bar_ts
+
+    def slot(self, symbol):
+        """Return the slot for `symbol`, allocating one if needed"""
+        i = self.slots.get(symbol)
+        if i is None:
+            i = len(self.symbols)
+            if i == self.latest.shape[0]:
+                self._allocate(2 * i)
+            self.symbols.append(symbol)
+            # Register last so readers never see a slot outside the current arrays
+            self.slots[symbol] = i
+        return i
+
+    def update(self, symbol, data, ts_ms=None):
+        """Store whitelisted OHLCV fields from a tick payload and append its LTP to the ring"""
+        i = self.slot(symbol)
+        row = self.latest[i]
+        for key, value in data.items():
+            idx = OHLCV_FIELD_IDX.get(key)
+            # null marks a value the publisher could not represent (NaN/Infinity)
+            if idx is not None and value is not None:
+                row[idx] = float(value)
+
+        if data.get('ltp') is not None:
+            ltp = row[LTP_IDX]
+            if ts_ms is None:
+                ts_ms = time.time_ns() // 1_000_000
+
+            pos = self.head[i] % self.history
+            self.ring_ltp[i, pos] = ltp
+            self.ring_ts[i, pos] = ts_ms
+            self.head[i] += 1
+
+            self._update_bar(i, ltp, ts_ms)
+
+    def _update_bar(self, i, ltp, ts_ms):
+        """Fold one LTP into the current bar of slot `i`, rolling to a new bar past its end"""
+        bar_end = -(-ts_ms // self.bar_ms) * self.bar_ms
+        bar = self.bar[i]
+        if bar_end != self.bar_ts[i]:
+            if self.bar_ts[i]:
+                self.prev_bar[i] = bar
+                self.prev_bar_ts[i] = self.bar_ts[i]
+            else:
+                self.first_bar_ts[i] = bar_end
+            # bar_ts moves before the values so last_closed_bar can detect the roll
+            self.bar_ts[i] = bar_end
+            bar[:] = ltp
+        else:
+            if ltp > bar[BAR_HIGH]:
+                bar[BAR_HIGH] = ltp
+            if ltp < bar[BAR_LOW]:
+                bar[BAR_LOW] = ltp
+            bar[BAR_CLOSE] = ltp
+
+    def __contains__(self, symbol):
+        return symbol in self.slots
+
+    def get(self, symbol, field='ltp'):
+        """Latest value of `field` for `symbol`, NaN if unknown"""
+        i = self.slots.get(symbol)
+        if i is None:
+            return np.nan
+        return float(self.latest[i, OHLCV_FIELD_IDX[field]])
+
+    def ltps(self, symbols):
+        """Latest LTP for each symbol as a float64 array, NaN where unknown"""
+        slots = self.slots
+        idx = np.fromiter((slots.get(s, -1) for s in symbols), dtype=np.int64, count=len(symbols))
+        latest = self.latest
+        out = np.full(len(idx), np.nan)
+        known = idx >= 0
+        out[known] = latest[idx[known], LTP_IDX]
+        return out
+
+    def ltp_history(self, symbol):
+        """(ts_ms, ltp) arrays for the ring of `symbol`, oldest first; empty if unknown"""
+        i = self.slots.get(symbol)
+        if i is None:
+            return np.empty(0, np.int64), np.empty(0, np.float64)
+
+        count = int(self.head[i])
+        if count <= self.history:
+            return self.ring_ts[i, :count].copy(), self.ring_ltp[i, :count].copy()
+
+        start = count % self.history
+        order = np.r_[start:self.history, 0:start]
+        return self.ring_ts[i, order], self.ring_ltp[i, order]
+
+    def is_first_bar(self, symbol, ts):
+        """
+        True if the bar ending at `ts` is the first one built for `symbol`. It only
+        starts at the first tick seen, so earlier ticks of that bar may be missing.
+        """
+        i = self.slots.get(symbol)
+        return i is not None and int(self.first_bar_ts[i]) == ts
+
+    def last_closed_bar(self, symbol, now_ms=None):
+        """
+        Most recent completed bar for `symbol` as a dict with the bar end time ('ts')
+        and open/high/low/close, or None if no bar has closed yet. The current bar
+        counts as closed once `now_ms` reaches its end, even with no later tick.
+        """
+        i = self.slots.get(symbol)
+        if i is None:
+            return None
+        if now_ms is None:
+            now_ms = time.time_ns() // 1_000_000
+
+        # Retry if the writer rolled to a new bar while we were copying
+        while True:
+            current_ts = int(self.bar_ts[i])
+            if current_ts and current_ts <= now_ms:
+                ts, bar = current_ts, self.bar[i].copy()
+            else:
+                ts, bar = int(self.prev_bar_ts[i]), self.prev_bar[i].copy()
+            if self.bar_ts[i] == current_ts:
+                break
+
+        if not ts:
+            return None
+
+        return {
+            'ts': ts,
+            'open': float(bar[BAR_OPEN]),
+            'high': float(bar[BAR_HIGH]),
+            'low': float(bar[BAR_LOW]),
+            'close': float(bar[BAR_CLOSE]),
+        }
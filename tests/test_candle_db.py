@@ -0,0 +1,43 @@
+import unittest
+from unittest.mock import patch
+
+from database import candle_db
+
+class TestCandleDB(unittest.TestCase):
+    def setUp(self):
+        # Fresh in-memory database per test; module state is restored afterwards
+        patches = [patch.object(candle_db, 'CANDLE_DB_PATH', ':memory:'),
+                   patch.object(candle_db, '_conn', None)]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def tearDown(self):
+        if candle_db._conn is not None:
+            candle_db._conn.close()
+
+    def test_upsert_and_range(self):
+        minute = 60_000
+        bars = [('SBIN', {'ts': i * minute, 'open': 10.0 + i, 'high': 12.0 + i, 'low': 9.0 + i, 'close': 11.0 + i})
+                for i in range(1, 6)]
+        self.assertEqual(candle_db.save_candles(bars), 5)
+        # Re-saving a bar replaces it
+        candle_db.save_candles([('SBIN', {'ts': 5 * minute, 'open': 15.0, 'high': 20.0, 'low': 14.0, 'close': 19.0})])
+
+        rows = candle_db.get_candles('SBIN', 2 * minute, 5 * minute)
+        self.assertEqual([r[0] for r in rows], [2 * minute, 3 * minute, 4 * minute, 5 * minute])
+        self.assertEqual(rows[-1], (5 * minute, 15.0, 20.0, 14.0, 19.0))
+        self.assertEqual(candle_db.get_candles('INFY', 0, 10 * minute), [])
+
+    def test_aggregates_right_labelled_buckets(self):
+        minute = 60_000
+        bars = [('SBIN', {'ts': i * minute, 'open': float(i), 'high': float(i) + 1, 'low': float(i) - 1, 'close': float(i)})
+                for i in range(1, 6)]
+        candle_db.save_candles(bars)
+
+        # Bars ending at 1..5 min fall into 5-minute bucket ending at 5 min
+        rows = candle_db.get_candles('SBIN', 0, 10 * minute, interval_minutes=5)
+        self.assertEqual(rows, [(5 * minute, 1.0, 6.0, 0.0, 5.0)])
+
+if __name__ == '__main__':
+    unittest.main()
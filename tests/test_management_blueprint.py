@@ -0,0 +1,93 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from flask import Flask
+
+from blueprints import management
+
+def make_rule(symbol, product, is_group_rule=False):
+    return SimpleNamespace(symbol=symbol, product=product, is_group_rule=is_group_rule)
+
+class TestManagementIndex(unittest.TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.secret_key = 'test'
+        self.app.register_blueprint(management.management_bp)
+
+    def render_index(self, positions, rules):
+        rendered = {}
+
+        def fake_render(template, **context):
+            rendered.update(context)
+            return ''
+
+        with patch.object(management, 'get_auth_token', return_value='token'), \
+             patch.object(management, 'get_positionbook_with_auth',
+                          return_value=(True, {'data': positions}, 200)), \
+             patch.object(management, 'get_rules_for_user', return_value=rules), \
+             patch.object(management, 'render_template', side_effect=fake_render):
+            client = self.app.test_client()
+            with client.session_transaction() as sess:
+                sess['user'] = 'alice'
+                sess['broker'] = 'angel'
+            client.get('/strategy/management/')
+
+        return {p['symbol']: p for p in rendered['positions']}
+
+    def test_exact_match_group_fallback_and_netqty(self):
+        exact = make_rule('SBIN', 'MIS')
+        group = make_rule('NIFTY', 'NRML', is_group_rule=True)
+        positions = [
+            # Exact (symbol, product) rule; quantity key
+            {'symbol': 'SBIN', 'product': 'MIS', 'quantity': '10'},
+            # Group prefix fallback; quantity only in a fallback key
+            {'symbol': 'NIFTY24JANFUT', 'product': 'NRML', 'netqty': '-50'},
+            # Prefix matches but product differs: no rule
+            {'symbol': 'NIFTY24FEBFUT', 'product': 'MIS', 'net_qty': '25'},
+            # Non-numeric first key falls through to the next one
+            {'symbol': 'INFY', 'product': 'CNC', 'quantity': '', 'qty': '3'},
+            # Closed position is filtered out
+            {'symbol': 'TCS', 'product': 'MIS', 'quantity': '0'},
+        ]
+
+        merged = self.render_index(positions, [exact, group])
+
+        self.assertEqual(set(merged), {'SBIN', 'NIFTY24JANFUT', 'NIFTY24FEBFUT', 'INFY'})
+        self.assertIs(merged['SBIN']['rule'], exact)
+        self.assertIs(merged['NIFTY24JANFUT']['rule'], group)
+        self.assertIsNone(merged['NIFTY24FEBFUT']['rule'])
+        self.assertIsNone(merged['INFY']['rule'])
+        self.assertEqual(merged['SBIN']['netqty'], 10.0)
+        self.assertEqual(merged['NIFTY24JANFUT']['netqty'], -50.0)
+        self.assertEqual(merged['NIFTY24FEBFUT']['netqty'], 25.0)
+        self.assertEqual(merged['INFY']['netqty'], 3.0)
+
+    def test_uneven_rows_keep_their_own_fields(self):
+        exact = make_rule('SBIN', 'MIS')
+        positions = [
+            {'symbol': 'SBIN', 'exchange': 'NSE', 'product': 'MIS', 'quantity': 5, 'pnl': 12.5},
+            # Broker omitted exchange and pnl on this row
+            {'symbol': 'INFY', 'product': 'CNC', 'netqty': '2'},
+            # No product at all: no exact or group match, still listed
+            {'symbol': 'TCS', 'exchange': 'NSE', 'qty': 1},
+        ]
+
+        merged = self.render_index(positions, [exact, make_rule('T', 'MIS', is_group_rule=True)])
+
+        self.assertEqual(merged['SBIN']['exchange'], 'NSE')
+        self.assertEqual(merged['SBIN']['quantity'], 5)
+        self.assertIsInstance(merged['SBIN']['quantity'], int)
+        self.assertEqual(merged['SBIN']['pnl'], 12.5)
+        self.assertIs(merged['SBIN']['rule'], exact)
+        self.assertNotIn('exchange', merged['INFY'])
+        self.assertNotIn('pnl', merged['INFY'])
+        self.assertNotIn('product', merged['TCS'])
+        self.assertIsNone(merged['TCS']['rule'])
+        self.assertEqual(merged['TCS']['netqty'], 1.0)
+
+    def test_no_positions(self):
+        self.assertEqual(self.render_index([], [make_rule('SBIN', 'MIS')]), {})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -59,5 +59,11 @@ class TestManagementDBMigration(unittest.TestCase):
                 self.assertIn('is_group_rule', columns, "is_group_rule column should have been added")
                 self.assertIn('included_positions', columns, "included_positions column should have been added")
 
+                result = conn.execute(text("PRAGMA index_list(management_rules)"))
+                indexes = [row[1] for row in result]
+
+                self.assertIn('idx_mgmt_active_user', indexes, "idx_mgmt_active_user index should have been created")
+                self.assertIn('idx_mgmt_symbol_product', indexes, "idx_mgmt_symbol_product index should have been created")
+
 if __name__ == '__main__':
     unittest.main()
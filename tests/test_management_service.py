@@ -0,0 +1,199 @@
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+
+import numpy as np
+
+# Load order mirrors app.py: restx_api must be imported before services.place_order_service
+import restx_api  # noqa: F401
+from services import management_service
+from services.management_service import (
+    match_group_rule_prefixes,
+    evaluate_rule_triggers,
+    sum_rule_pnl,
+    process_market_data,
+    TRIGGER_NONE,
+    TRIGGER_TARGET_PROFIT,
+    TRIGGER_MAX_LOSS,
+)
+from services.tick_store import TickStore
+
+class TestGroupRuleMatching(unittest.TestCase):
+    def test_prefix_and_product_match(self):
+        rules = [
+            SimpleNamespace(id=1, product='MIS', symbol='NIFTY'),
+            SimpleNamespace(id=2, product='MIS', symbol='NIFTY24'),
+            SimpleNamespace(id=3, product='NRML', symbol='BANK'),
+        ]
+        # product -> [(symbol, position index)]
+        positions_by_product = {
+            'MIS': [('NIFTY24JAN22000CE', 0), ('BANKNIFTY24JAN', 1), ('NIF', 2)],
+            'NRML': [('BANKNIFTY24JAN', 3), ('NIFTY24JAN', 4)],
+        }
+
+        matches = match_group_rule_prefixes(rules, positions_by_product)
+
+        self.assertEqual(matches[1], [0])
+        self.assertEqual(matches[2], [0])
+        # BANK rule is NRML only; the MIS BANKNIFTY position must not match
+        self.assertEqual(matches[3], [3])
+
+    def test_no_rules(self):
+        matches = match_group_rule_prefixes([], {'MIS': [('SBIN', 0)]})
+        self.assertEqual(dict(matches), {})
+
+class TestRuleTriggers(unittest.TestCase):
+    def test_trigger_outcomes(self):
+        nan = np.nan
+        pnl = np.array([500.0, -300.0, -100.0, 200.0, -50.0], dtype=np.float64)
+        target = np.array([400.0, 400.0, nan, nan, 100.0], dtype=np.float64)
+        max_loss = np.array([nan, 250.0, 250.0, 100.0, nan], dtype=np.float64)
+
+        triggers = evaluate_rule_triggers(pnl, target, max_loss)
+
+        self.assertEqual(list(triggers), [
+            TRIGGER_TARGET_PROFIT,  # profit reached target
+            TRIGGER_MAX_LOSS,       # loss beyond max_loss
+            TRIGGER_NONE,           # loss within max_loss
+            TRIGGER_NONE,           # profit never hits a loss threshold
+            TRIGGER_NONE,           # disabled max_loss
+        ])
+
+    def test_large_batch_matches_numpy(self):
+        # Large enough to take the parallel path when numba is installed
+        rng = np.random.default_rng(7)
+        n = management_service.PARALLEL_TRIGGER_MIN_RULES + 1
+        pnl = rng.uniform(-1000, 1000, n)
+        target = np.where(rng.random(n) < 0.5, rng.uniform(0, 1000, n), np.nan)
+        max_loss = np.where(rng.random(n) < 0.5, rng.uniform(0, 1000, n), np.nan)
+
+        np.testing.assert_array_equal(
+            evaluate_rule_triggers(pnl, target, max_loss),
+            management_service._evaluate_rule_triggers_numpy(pnl, target, max_loss),
+        )
+
+    def test_empty(self):
+        empty = np.array([], dtype=np.float64)
+        self.assertEqual(len(evaluate_rule_triggers(empty, empty, empty)), 0)
+
+class TestRulePnl(unittest.TestCase):
+    def test_sums_per_rule(self):
+        position_pnl = np.array([100.0, -40.0, 25.0, -300.0], dtype=np.float64)
+        rule_positions = [[0, 1, 2], [3], [1, 3]]
+
+        self.assertEqual(list(sum_rule_pnl(position_pnl, rule_positions)), [85.0, -300.0, -340.0])
+        self.assertEqual(len(sum_rule_pnl(position_pnl, [])), 0)
+
+    def test_quantizes_to_paise(self):
+        # 0.1 + 0.2 - 0.3 style drift must not leave a loss just short of its threshold
+        position_pnl = np.array([-100.1, -199.7, -200.2], dtype=np.float64)
+        self.assertEqual(list(sum_rule_pnl(position_pnl, [[0, 1, 2]])), [-500.0])
+
+class TestProcessMarketData(unittest.TestCase):
+    def test_parses_raw_bytes_and_topic_fallback(self):
+        # Payload symbol wins; the topic is only used when the payload has none
+        self.assertEqual(process_market_data(b'angel_NSE_TESTA_LTP', b'{"symbol":"TESTA","ltp":101.5}'), 'TESTA')
+        self.assertEqual(process_market_data(b'angel_NSE_TESTB_LTP', b'{"ltp":55}'), 'TESTB')
+        self.assertEqual(management_service.tick_store.get('TESTA'), 101.5)
+        self.assertEqual(management_service.tick_store.get('TESTB'), 55.0)
+
+    def test_receive_timestamp_is_stored(self):
+        process_market_data(b'angel_NSE_TESTD_LTP', b'{"symbol":"TESTD","ltp":42}', 1_700_000_000_123)
+        ts, ltp = management_service.tick_store.ltp_history('TESTD')
+        self.assertEqual(list(ts), [1_700_000_000_123])
+        self.assertEqual(list(ltp), [42.0])
+
+    def test_bad_payload_is_ignored(self):
+        self.assertIsNone(process_market_data(b'angel_NSE_TESTC_LTP', b'not json'))
+        self.assertNotIn('TESTC', management_service.tick_store)
+
+def make_rule_row(id, symbol, product, exit_type='TOTAL_LOSS', max_loss=None, target_profit=None,
+                  is_group_rule=False, included_positions=None, user_id='alice', exchange='NSE'):
+    """Stand-in for a column-only row from get_active_rules"""
+    return SimpleNamespace(id=id, user_id=user_id, symbol=symbol, exchange=exchange, product=product,
+                           exit_type=exit_type, max_loss=max_loss, target_profit=target_profit,
+                           is_group_rule=is_group_rule, included_positions=included_positions)
+
+class TestCheckRules(unittest.TestCase):
+    def run_check_rules(self, rules, positions, ltps, rejected=()):
+        """Run one full pass with the broker, DB and market data mocked. Returns (orders, deactivated ids)."""
+        management_service._normalize_positions(positions)
+        store = TickStore()
+        for symbol, ltp in ltps.items():
+            store.update(symbol, {'ltp': ltp})
+
+        orders = []
+        def fake_place_order(payload):
+            orders.append(payload)
+            if payload['symbol'] in rejected:
+                return False, {'status': 'error', 'message': 'rejected'}, 400
+            return True, {'status': 'success', 'orderid': '1'}, 200
+
+        deactivate = MagicMock(return_value=0)
+        with patch.object(management_service, 'get_active_rules', return_value=rules), \
+             patch.object(management_service, 'deactivate_rules', deactivate), \
+             patch.object(management_service, 'db_session'), \
+             patch.object(management_service, 'get_api_key_for_user', return_value='key'), \
+             patch.object(management_service, 'get_positionbook_cached',
+                          return_value=(True, {'data': positions}, 200)), \
+             patch.object(management_service, 'place_order', side_effect=fake_place_order), \
+             patch.object(management_service, 'tick_store', store), \
+             patch.object(management_service, 'watched_users_by_symbol', {}), \
+             patch.object(management_service, 'position_snapshot_cache', {}), \
+             patch.object(management_service, 'positionbook_cache', {}):
+            self.assertEqual(management_service.check_rules(), len(rules))
+
+        deactivated = set(deactivate.call_args[0][0]) if deactivate.called else set()
+        return {o['symbol']: o for o in orders}, deactivated
+
+    def test_full_pass(self):
+        rules = [
+            make_rule_row(1, 'SBIN', 'MIS', max_loss=100),                                  # long, loss hit
+            make_rule_row(2, 'INFY', 'MIS', exit_type='BOTH', target_profit=200),           # short, target hit
+            make_rule_row(3, 'NIFTY', 'NRML', target_profit=500, is_group_rule=True,
+                          exchange='NFO'),                                                  # group prefix target
+            make_rule_row(4, 'TCS', 'MIS', max_loss=1),                                     # position closed
+            make_rule_row(5, 'HDFCBANK', 'MIS', max_loss=50),                               # order rejected
+            make_rule_row(6, 'WIPRO', 'MIS', max_loss=1000),                                # within limits
+        ]
+        positions = [
+            {'symbol': 'SBIN', 'exchange': 'NSE', 'product': 'MIS', 'quantity': '10', 'netavgprc': '100'},
+            {'symbol': 'INFY', 'exchange': 'NSE', 'product': 'MIS', 'quantity': '-20', 'netavgprc': '1500'},
+            {'symbol': 'NIFTY24JANFUT', 'exchange': 'NFO', 'product': 'NRML', 'quantity': '50', 'netavgprc': '20000'},
+            {'symbol': 'NIFTY24FEBFUT', 'exchange': 'NFO', 'product': 'NRML', 'quantity': '-25', 'netavgprc': '20100'},
+            {'symbol': 'TCS', 'exchange': 'NSE', 'product': 'MIS', 'quantity': '0', 'netavgprc': '3000'},
+            {'symbol': 'HDFCBANK', 'exchange': 'NSE', 'product': 'MIS', 'quantity': '5', 'netavgprc': '1600'},
+            {'symbol': 'WIPRO', 'exchange': 'NSE', 'product': 'MIS', 'quantity': '10', 'netavgprc': '400'},
+        ]
+        ltps = {
+            'SBIN': 85.0,             # (85 - 100) * 10 = -150
+            'INFY': 1489.0,           # (1489 - 1500) * -20 = 220
+            'NIFTY24JANFUT': 20010.0, # 500 ...
+            'NIFTY24FEBFUT': 20096.0, # ... + 100 = 600
+            'TCS': 1.0,
+            'HDFCBANK': 1580.0,       # -100
+            'WIPRO': 390.0,           # -100
+        }
+
+        orders, deactivated = self.run_check_rules(rules, positions, ltps, rejected={'HDFCBANK'})
+
+        self.assertEqual(set(orders), {'SBIN', 'INFY', 'NIFTY24JANFUT', 'NIFTY24FEBFUT', 'HDFCBANK'})
+        self.assertEqual((orders['SBIN']['action'], orders['SBIN']['quantity']), ('SELL', '10'))
+        self.assertEqual((orders['INFY']['action'], orders['INFY']['quantity']), ('BUY', '20'))
+        self.assertEqual((orders['NIFTY24JANFUT']['action'], orders['NIFTY24JANFUT']['quantity']), ('SELL', '50'))
+        self.assertEqual((orders['NIFTY24FEBFUT']['action'], orders['NIFTY24FEBFUT']['quantity']), ('BUY', '25'))
+        self.assertEqual(orders['SBIN']['pricetype'], 'MARKET')
+        # Rejected order keeps its rule active; the rest are deactivated in one call
+        self.assertEqual(deactivated, {1, 2, 3})
+
+    def test_nothing_triggered(self):
+        rules = [make_rule_row(1, 'SBIN', 'MIS', max_loss=100)]
+        positions = [{'symbol': 'SBIN', 'exchange': 'NSE', 'product': 'MIS', 'quantity': '10', 'netavgprc': '100'}]
+
+        orders, deactivated = self.run_check_rules(rules, positions, {'SBIN': 95.0})
+
+        self.assertEqual(orders, {})
+        self.assertEqual(deactivated, set())
+
+if __name__ == '__main__':
+    unittest.main()
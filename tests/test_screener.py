@@ -1,7 +1,7 @@
 import unittest
 from unittest.mock import MagicMock, patch
 from flask import Flask, session
-from blueprints.screener import screener_bp
+from blueprints.screener import screener_bp, calculate_ema
 
 class TestScreener(unittest.TestCase):
     def setUp(self):
@@ -51,5 +51,14 @@ class TestScreener(unittest.TestCase):
          response = self.client.get('/screener/scan_vbl')
          self.assertEqual(response.status_code, 400)
 
+    def test_calculate_ema(self):
+        # Constant series stays constant
+        self.assertAlmostEqual(calculate_ema([50.0] * 25, 20), 50.0)
+
+        # Seeded with the first value, then alpha = 2 / (span + 1)
+        alpha = 2.0 / 21
+        expected = alpha * 110.0 + (1 - alpha) * 100.0
+        self.assertAlmostEqual(calculate_ema([100.0, 110.0], 20), expected)
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+
+import numpy as np
+
+from services.tick_store import TickStore
+
+class TestTickStore(unittest.TestCase):
+    def test_latest_fields_and_unknown_symbol(self):
+        store = TickStore(capacity=2, history=4)
+        store.update('SBIN', {'ltp': '801.5', 'volume': 1000, 'symbol': 'SBIN'})
+
+        self.assertEqual(store.get('SBIN'), 801.5)
+        self.assertEqual(store.get('SBIN', 'volume'), 1000.0)
+        self.assertTrue(np.isnan(store.get('SBIN', 'open')))
+        self.assertTrue(np.isnan(store.get('INFY')))
+
+        ltps = store.ltps(['INFY', 'SBIN'])
+        self.assertTrue(np.isnan(ltps[0]))
+        self.assertEqual(ltps[1], 801.5)
+
+    def test_null_fields_are_skipped(self):
+        store = TickStore()
+        store.update('SBIN', {'ltp': 801.5, 'volume': 10})
+        store.update('SBIN', {'ltp': None, 'volume': None})
+
+        self.assertEqual(store.get('SBIN'), 801.5)
+        self.assertEqual(store.get('SBIN', 'volume'), 10.0)
+        self.assertEqual(list(store.ltp_history('SBIN')[1]), [801.5])
+
+    def test_grows_past_initial_capacity(self):
+        store = TickStore(capacity=1, history=4)
+        for i, symbol in enumerate(['A', 'B', 'C']):
+            store.update(symbol, {'ltp': 10.0 + i})
+
+        self.assertEqual(list(store.ltps(['A', 'B', 'C'])), [10.0, 11.0, 12.0])
+
+    def test_ltp_history_wraps_oldest_first(self):
+        store = TickStore(history=3)
+        for i in range(5):
+            store.update('SBIN', {'ltp': float(i)}, ts_ms=1000 + i)
+
+        ts, ltp = store.ltp_history('SBIN')
+        self.assertEqual(list(ltp), [2.0, 3.0, 4.0])
+        self.assertEqual(list(ts), [1002, 1003, 1004])
+
+    def test_last_closed_bar(self):
+        store = TickStore()
+        minute = 60_000
+        # Three ticks in the first minute, one in the still-open second minute
+        for ts_ms, ltp in [(minute + 1000, 10.0), (minute + 2000, 12.0), (minute + 3000, 9.0),
+                           (2 * minute + 5000, 11.0)]:
+            store.update('SBIN', {'ltp': ltp}, ts_ms=ts_ms)
+
+        bar = store.last_closed_bar('SBIN', now_ms=2 * minute + 10_000)
+        self.assertEqual(bar, {'ts': 2 * minute, 'open': 10.0, 'high': 12.0, 'low': 9.0, 'close': 9.0})
+        self.assertIsNone(store.last_closed_bar('INFY'))
+
+    def test_bar_closes_without_a_later_tick(self):
+        # e.g. the session's last bar: no tick arrives after the boundary
+        store = TickStore()
+        minute = 60_000
+        store.update('SBIN', {'ltp': 10.0}, ts_ms=minute + 1000)
+        store.update('SBIN', {'ltp': 11.0}, ts_ms=2 * minute)  # boundary tick closes the bar
+
+        self.assertIsNone(store.last_closed_bar('SBIN', now_ms=2 * minute - 1))
+        bar = store.last_closed_bar('SBIN', now_ms=2 * minute + 500)
+        self.assertEqual(bar, {'ts': 2 * minute, 'open': 10.0, 'high': 11.0, 'low': 10.0, 'close': 11.0})
+
+    def test_bar_is_not_limited_by_ring_size(self):
+        store = TickStore(history=4)
+        minute = 60_000
+        # Extremes fall outside the last `history` ticks of the minute
+        ltps = [50.0, 99.0, 1.0] + [50.0] * 10
+        for k, ltp in enumerate(ltps):
+            store.update('SBIN', {'ltp': ltp}, ts_ms=minute + 1 + k)
+
+        bar = store.last_closed_bar('SBIN', now_ms=minute * 2)
+        self.assertEqual(bar, {'ts': 2 * minute, 'open': 50.0, 'high': 99.0, 'low': 1.0, 'close': 50.0})
+
+    def test_first_bar_is_flagged(self):
+        store = TickStore()
+        minute = 60_000
+        # First tick lands mid-bar: that bar is partial, the next one is not
+        store.update('SBIN', {'ltp': 10.0}, ts_ms=minute + 30_000)
+        store.update('SBIN', {'ltp': 11.0}, ts_ms=2 * minute + 1000)
+        store.update('SBIN', {'ltp': 12.0}, ts_ms=3 * minute + 1000)
+
+        self.assertTrue(store.is_first_bar('SBIN', 2 * minute))
+        self.assertFalse(store.is_first_bar('SBIN', 3 * minute))
+        self.assertFalse(store.is_first_bar('INFY', 2 * minute))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -102,3 +102,6 @@ DEFAULT_PRICE_TYPE = PRICE_TYPE_MARKET
 DEFAULT_PRICE = "0"
 DEFAULT_TRIGGER_PRICE = "0"
 DEFAULT_DISCLOSED_QUANTITY = "0"
+
+# Position fields that may carry the net quantity (broker-specific), in priority order
+NET_QTY_KEYS = ('quantity', 'netqty', 'net_qty', 'qty')
@@ -1,15 +1,27 @@
-import json
+import orjson
 import threading
 import zmq
 import random
 import socket
 import os
+from decimal import Decimal
 from abc import ABC, abstractmethod
 from utils.logging import get_logger
 
 # Initialize logger
 logger = get_logger(__name__)
 
+# Numpy scalars/arrays and non-string keys (e.g. integer depth levels) are converted natively
+_ORJSON_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+def _json_default(obj):
+    """Convert the remaining broker payload types orjson does not serialize natively"""
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
 def is_port_available(port):
     """
     Check if a port is available for use
@@ -255,9 +267,13 @@ class BaseBrokerWebSocketAdapter(ABC):
             data: Market data dictionary
         """
         try:
+            # orjson emits compact, strict UTF-8 JSON (NaN/Infinity become null), which is
+            # what the orjson-based subscribers accept; the wire format stays JSON
+            payload = orjson.dumps(data, default=_json_default, option=_ORJSON_OPTIONS)
+
             self.socket.send_multipart([
                 topic.encode('utf-8'),
-                json.dumps(data).encode('utf-8')
+                payload
             ])
         except Exception as e:
             self.logger.exception(f"Error publishing market data: {e}")
@@ -1,6 +1,7 @@
 import asyncio as aio
 import websockets
 import json
+import orjson
 from utils.logging import get_logger, highlight_url
 import signal
 import zmq
@@ -76,6 +77,10 @@ class WebSocketProxy:
         # PERFORMANCE OPTIMIZATION 3: Pre-compute mode mappings
         self.MODE_MAP = {"LTP": 1, "QUOTE": 2, "DEPTH": 3}
 
+        # PERFORMANCE OPTIMIZATION 4: Parsed ZMQ topics
+        # Maps raw topic bytes -> (broker_name, exchange, symbol, mode_str)
+        self.topic_cache: Dict[bytes, Tuple[str, str, str, str]] = {}
+
         # ZeroMQ context for subscribing to broker adapters
         self.context = zmq.asyncio.Context()
         self.socket = self.context.socket(zmq.SUB)
@@ -887,6 +892,31 @@ class WebSocketProxy:
             "message": message
         })
     
+    def _parse_topic(self, topic_str):
+        """
+        Split a ZMQ topic into (broker_name, exchange, symbol, mode_str), or None if malformed.
+        Supports both formats:
+        New format: BROKER_EXCHANGE_SYMBOL_MODE (with broker name)
+        Old format: EXCHANGE_SYMBOL_MODE (without broker name)
+        Special case: NSE_INDEX_SYMBOL_MODE (exchange contains underscore)
+        """
+        parts = topic_str.split('_')
+
+        # Special case handling for NSE_INDEX and BSE_INDEX
+        if len(parts) >= 4 and parts[0] == "NSE" and parts[1] == "INDEX":
+            return "unknown", "NSE_INDEX", parts[2], parts[3]
+        if len(parts) >= 4 and parts[0] == "BSE" and parts[1] == "INDEX":
+            return "unknown", "BSE_INDEX", parts[2], parts[3]
+        if len(parts) >= 5 and parts[1] == "INDEX":  # BROKER_NSE_INDEX_SYMBOL_MODE format
+            return parts[0], f"{parts[1]}_{parts[2]}", parts[3], parts[4]
+        if len(parts) >= 4:
+            # Standard format with broker name
+            return parts[0], parts[1], parts[2], parts[3]
+        if len(parts) >= 3:
+            # Old format without broker name
+            return "unknown", parts[0], parts[1], parts[2]
+        return None
+
     async def zmq_listener(self):
         """
         OPTIMIZED: Listen for messages from broker adapters via ZeroMQ and forward to clients
@@ -915,49 +945,20 @@ class WebSocketProxy:
                     continue
                 
                 # Parse the message
-                topic_str = topic.decode('utf-8')
-                data_str = data.decode('utf-8')
-                market_data = json.loads(data_str)
-                
-                # Extract topic components
-                # Support both formats:
-                # New format: BROKER_EXCHANGE_SYMBOL_MODE (with broker name)
-                # Old format: EXCHANGE_SYMBOL_MODE (without broker name)
-                # Special case: NSE_INDEX_SYMBOL_MODE (exchange contains underscore)
-                parts = topic_str.split('_')
-                
-                # Special case handling for NSE_INDEX and BSE_INDEX
-                if len(parts) >= 4 and parts[0] == "NSE" and parts[1] == "INDEX":
-                    broker_name = "unknown"
-                    exchange = "NSE_INDEX"
-                    symbol = parts[2]
-                    mode_str = parts[3]
-                elif len(parts) >= 4 and parts[0] == "BSE" and parts[1] == "INDEX":
-                    broker_name = "unknown"
-                    exchange = "BSE_INDEX"
-                    symbol = parts[2]
-                    mode_str = parts[3]
-                elif len(parts) >= 5 and parts[1] == "INDEX":  # BROKER_NSE_INDEX_SYMBOL_MODE format
-                    broker_name = parts[0]
-                    exchange = f"{parts[1]}_{parts[2]}"
-                    symbol = parts[3]
-                    mode_str = parts[4]
-                elif len(parts) >= 4:
-                    # Standard format with broker name
-                    broker_name = parts[0]
-                    exchange = parts[1]
-                    symbol = parts[2]
-                    mode_str = parts[3]
-                elif len(parts) >= 3:
-                    # Old format without broker name
-                    broker_name = "unknown"
-                    exchange = parts[0]
-                    symbol = parts[1] 
-                    mode_str = parts[2]
-                else:
-                    logger.warning(f"Invalid topic format: {topic_str}")
-                    continue
-                
+                market_data = orjson.loads(data)
+
+                # OPTIMIZATION: Topics repeat per symbol/mode, so parse each one only once
+                parsed_topic = self.topic_cache.get(topic)
+                if parsed_topic is None:
+                    topic_str = topic.decode('utf-8')
+                    parsed_topic = self._parse_topic(topic_str)
+                    if parsed_topic is None:
+                        logger.warning(f"Invalid topic format: {topic_str}")
+                        continue
+                    self.topic_cache[topic] = parsed_topic
+
+                broker_name, exchange, symbol, mode_str = parsed_topic
+
                 # OPTIMIZATION: Use pre-computed mode map
                 mode = self.MODE_MAP.get(mode_str)
 